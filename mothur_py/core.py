@@ -129,6 +129,54 @@ class Mothur(object):
 
         return logfile
 
+    def dist_shared(self, shared='current', output='lt', **kwargs):
+        """
+        Computes pairwise distances from a `.shared` file in python, as a replacement for `dist.shared()`.
+
+        See `mothur_py.distances.dist_shared` for the available parameters. Unlike mothur's `dist.shared()` the
+        distances are also returned as numpy arrays, and writing distance files can be skipped by passing output=None.
+
+        :param shared: path to the `.shared` file, or 'current' to use the latest output or current `.shared` file
+        :type shared: str
+        :param output: format of distance files to write, either 'lt', 'square', 'column', or None to not write files
+        :type output: str or None
+
+        :return: the group names for each label, the distances and standard deviations for each label and calculator,
+        and the written output files
+        :rtype: mothur_py.distances.SharedDistances
+
+        """
+
+        # imported here so numpy and scipy are only required when using this functionality
+        from mothur_py.distances import dist_shared
+
+        if shared == 'current':
+            if self.output_files.get('shared'):
+                shared = self.output_files['shared'][-1]
+            elif 'shared' in self.current_files:
+                shared = self.current_files['shared']
+            else:
+                raise (ValueError('no current shared file, a shared file must be specified.'))
+
+        # resolve relative paths the same way as mothur by checking the input directory
+        if not os.path.isfile(shared) and 'input' in self.current_dirs:
+            shared = os.path.join(self.current_dirs['input'], shared)
+
+        kwargs.setdefault('seed', self.mothur_seed)
+        if 'output' in self.current_dirs:
+            kwargs.setdefault('outputdir', self.current_dirs['output'])
+
+        results = dist_shared(shared, output=output, **kwargs)
+
+        # mirror mothur by updating the output and current files only when files are written
+        if results.output_files:
+            new_output_files = collections.defaultdict(list)
+            new_output_files['dist'].extend(results.output_files)
+            self.output_files = new_output_files
+            self.current_files['column' if output == 'column' else 'phylip'] = results.output_files[0]
+
+        return results
+
 
 class MothurCommand(object):
     """
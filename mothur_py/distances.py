@@ -0,0 +1,664 @@
+"""
+Copyright (c) 2018 Richard Campen
+All rights reserved.
+
+Licensed under the Modified BSD License.
+For full license terms see LICENSE.txt
+
+"""
+
+import collections
+import collections.abc
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    raise (ImportError('mothur_py.distances requires python 3.8 or later.'))
+
+import numpy as np
+import scipy.sparse
+from scipy.spatial.distance import cdist
+
+# shared files with a lower proportion of non-zero counts than this are handled as sparse matrices
+SPARSE_DENSITY_THRESHOLD = 0.3
+
+# container for the results of dist_shared()
+SharedDistances = collections.namedtuple('SharedDistances', ['groups', 'distances', 'stdevs', 'output_files'])
+
+
+def read_shared(shared, labels=None, groups=None):
+    """
+    Reads a mothur `.shared` file into count matrices.
+
+    :param shared: path to the `.shared` file
+    :type shared: str
+    :param labels: labels to keep, or None to keep all labels
+    :type labels: list or None
+    :param groups: groups to keep, or None to keep all groups
+    :type groups: list or None
+
+    :return: dictionary of label to a tuple of group names and a (groups x otus) numpy array of counts
+    :rtype: collections.OrderedDict
+
+    """
+
+    rows = collections.OrderedDict()
+    found_groups = set()
+    with open(shared, 'r') as in_handle:
+        # the header line contains the OTU names after the `label`, `Group`, and `numOtus` columns
+        in_handle.readline()
+        for line in in_handle:
+            line = line.rstrip('\r\n')
+            if not line:
+                continue
+            fields = line.split('\t')
+            label, group = fields[0], fields[1]
+            if labels is not None and label not in labels:
+                continue
+            if groups is not None and group not in groups:
+                continue
+            found_groups.add(group)
+            num_otus = int(fields[2])
+            rows.setdefault(label, list()).append((group, fields[3:3 + num_otus]))
+
+    if labels is not None:
+        missing = [label for label in labels if label not in rows]
+        if missing:
+            raise (ValueError('labels not found in %s: %s' % (shared, ', '.join(missing))))
+    if groups is not None:
+        missing = [group for group in groups if group not in found_groups]
+        if missing:
+            raise (ValueError('groups not found in %s: %s' % (shared, ', '.join(missing))))
+
+    shared_data = collections.OrderedDict()
+    for label, label_rows in rows.items():
+        group_names = [group for group, _ in label_rows]
+        counts = np.array([counts for _, counts in label_rows], dtype=np.int64)
+        shared_data[label] = (group_names, counts)
+
+    return shared_data
+
+
+# --------------- distance calculators --------------- #
+
+def _indicator(x, value=None):
+    """Returns a float matrix flagging entries of `x` equal to `value`, or greater than zero if `value` is None."""
+
+    if scipy.sparse.issparse(x):
+        data = (x.data > 0) if value is None else (x.data == value)
+        # copy the index arrays as eliminate_zeros() compacts them in place
+        ind = scipy.sparse.csr_matrix((data.astype(np.float64), x.indices.copy(), x.indptr.copy()), shape=x.shape)
+        ind.eliminate_zeros()
+        return ind
+
+    return ((x > 0) if value is None else (x == value)).astype(np.float64)
+
+
+def _cross(a, b):
+    """Returns the dense (rows of a x rows of b) matrix product of `a` and `b`."""
+
+    product = a @ b.T
+    if scipy.sparse.issparse(product):
+        product = product.toarray()
+
+    return np.asarray(product, dtype=np.float64)
+
+
+def _row_sums(x):
+    """Returns the row sums of a dense or sparse matrix as a flat float array."""
+
+    return np.asarray(x.sum(axis=1), dtype=np.float64).ravel()
+
+
+def _relative(x):
+    """Returns the relative abundances of each row of `x`."""
+
+    totals = _row_sums(x)
+    totals[totals == 0] = 1
+    if scipy.sparse.issparse(x):
+        return scipy.sparse.diags(1 / totals) @ x
+
+    return x / totals[:, None]
+
+
+def _chao_term(f1, f2):
+    """Returns the chao1 correction term for singletons `f1` and doubletons `f2`, bias-corrected when `f2` is zero."""
+
+    f2_safe = np.where(f2 > 0, f2, 1)
+    return np.where(f2 > 0, (f1 * f1) / (2 * f2_safe), f1 * (f1 - 1) / 2)
+
+
+def _l1_sparse(a, b):
+    """
+    Returns the pairwise L1 distances between the rows of sparse matrices `a` and `b`.
+
+    OTUs observed in many rows of both blocks are compared as dense columns. For the remaining OTUs the L1 distance is
+    sum(a) + sum(b) - 2 * sum(min(a, b)), where the shared minimum only needs the pairs of non-zero counts in each OTU.
+
+    """
+
+    a, b = a.tocsc(), b.tocsc()
+    nnz_a, nnz_b = np.diff(a.indptr), np.diff(b.indptr)
+    dense = (nnz_a > SPARSE_DENSITY_THRESHOLD * a.shape[0]) & (nnz_b > SPARSE_DENSITY_THRESHOLD * b.shape[0])
+
+    cols = np.flatnonzero(dense)
+    l1 = cdist(a[:, cols].toarray().astype(np.float64), b[:, cols].toarray().astype(np.float64), 'cityblock')
+
+    # column of each non-zero count, and whether it falls in the remaining sparse OTUs
+    col_a, col_b = np.repeat(np.arange(a.shape[1]), nnz_a), np.repeat(np.arange(b.shape[1]), nnz_b)
+    sparse_a, sparse_b = ~dense[col_a], ~dense[col_b]
+    l1 += np.bincount(a.indices[sparse_a], weights=a.data[sparse_a], minlength=a.shape[0])[:, None]
+    l1 += np.bincount(b.indices[sparse_b], weights=b.data[sparse_b], minlength=b.shape[0])[None, :]
+
+    # pair each non-zero count in `a` with every non-zero count of the same OTU in `b`
+    num_pairs = np.where(dense, 0, nnz_b)[col_a]
+    idx_a = np.repeat(np.arange(col_a.size), num_pairs)
+    idx_b = b.indptr[col_a[idx_a]] + np.arange(idx_a.size) - np.repeat(np.cumsum(num_pairs) - num_pairs, num_pairs)
+    shared_min = np.bincount(a.indices[idx_a] * b.shape[0] + b.indices[idx_b],
+                             weights=np.minimum(a.data[idx_a], b.data[idx_b]), minlength=a.shape[0] * b.shape[0])
+
+    return l1 - 2 * shared_min.reshape(a.shape[0], b.shape[0])
+
+
+def _braycurtis(a, b):
+    """Bray-Curtis dissimilarity: 1 - 2 * sum(min(a, b)) / (sum(a) + sum(b)), i.e. L1(a, b) / (sum(a) + sum(b))."""
+
+    if scipy.sparse.issparse(a):
+        l1 = _l1_sparse(a, b)
+    else:
+        # only OTUs observed in either block can contribute to the L1 distance
+        cols = np.flatnonzero(a.any(axis=0) | b.any(axis=0))
+        l1 = cdist(a[:, cols].astype(np.float64), b[:, cols].astype(np.float64), 'cityblock')
+
+    return l1 / (_row_sums(a)[:, None] + _row_sums(b)[None, :])
+
+
+def _thetayc(a, b):
+    """Yue & Clayton theta dissimilarity calculated from relative abundances."""
+
+    rel_a, rel_b = _relative(a), _relative(b)
+    numerator = _cross(rel_a, rel_b)
+    sum_sq_a = _row_sums(rel_a.multiply(rel_a) if scipy.sparse.issparse(rel_a) else rel_a * rel_a)
+    sum_sq_b = _row_sums(rel_b.multiply(rel_b) if scipy.sparse.issparse(rel_b) else rel_b * rel_b)
+
+    return 1 - numerator / (sum_sq_a[:, None] + sum_sq_b[None, :] - numerator)
+
+
+def _jclass(a, b):
+    """Jaccard dissimilarity calculated from observed richness."""
+
+    obs_a, obs_b = _indicator(a), _indicator(b)
+    shared_obs = _cross(obs_a, obs_b)
+    total_obs = _row_sums(obs_a)[:, None] + _row_sums(obs_b)[None, :]
+
+    return 1 - shared_obs / (total_obs - shared_obs)
+
+
+def _jest(a, b):
+    """Jaccard dissimilarity calculated from chao1 estimates of individual and shared richness."""
+
+    obs_a, obs_b = _indicator(a), _indicator(b)
+    single_a, single_b = _indicator(a, 1), _indicator(b, 1)
+    double_a, double_b = _indicator(a, 2), _indicator(b, 2)
+
+    # chao1 richness estimates for each group
+    chao_a = _row_sums(obs_a) + _chao_term(_row_sums(single_a), _row_sums(double_a))
+    chao_b = _row_sums(obs_b) + _chao_term(_row_sums(single_b), _row_sums(double_b))
+
+    # shared chao1 estimate (Chao et al. 2000) from the singletons and doubletons within the shared OTUs
+    f11 = _cross(single_a, single_b)
+    f22 = _cross(double_a, double_b)
+    f22_safe = np.where(f22 > 0, f22, 1)
+    shared_chao = (
+        _cross(obs_a, obs_b)
+        + _chao_term(_cross(single_a, obs_b), _cross(double_a, obs_b))
+        + _chao_term(_cross(obs_a, single_b), _cross(obs_a, double_b))
+        + np.where(f22 > 0, (f11 * f11) / (4 * f22_safe), f11 * (f11 - 1) / 4)
+    )
+
+    return 1 - shared_chao / (chao_a[:, None] + chao_b[None, :] - shared_chao)
+
+
+CALCULATORS = collections.OrderedDict([
+    ('braycurtis', _braycurtis),
+    ('thetayc', _thetayc),
+    ('jclass', _jclass),
+    ('jest', _jest),
+])
+
+
+# --------------- blocked computation --------------- #
+
+def _block_edges(num_rows, block_size):
+    """Returns the bounds of consecutive blocks of rows covering `num_rows` rows."""
+
+    return [(start, min(start + block_size, num_rows)) for start in range(0, num_rows, block_size)]
+
+
+def _block_bounds(num_rows, block_size):
+    """Returns the bounds for the upper triangle of blocks covering a (num_rows x num_rows) matrix."""
+
+    edges = _block_edges(num_rows, block_size)
+    return [(i0, i1, j0, j1) for n, (i0, i1) in enumerate(edges) for (j0, j1) in edges[n:]]
+
+
+def _state_matrix(state, subsampled):
+    """Returns the original or subsampled count matrix held in an engine or worker state."""
+
+    arrays = state['arrays']
+    if 'counts' in arrays:
+        return arrays['subsampled'] if subsampled else arrays['counts']
+
+    # subsampled counts share the indices of the original counts, so may contain explicit zeros
+    data = arrays['subsampled'] if subsampled else arrays['data']
+    return scipy.sparse.csr_matrix((data, arrays['indices'], arrays['indptr']), shape=state['shape'])
+
+
+def _subsample_rows(state, rows, size, iter_seed):
+    """
+    Randomly subsamples each row in `rows` to `size` counts without replacement.
+
+    Each row is seeded from the iteration seed and its index so the results do not depend on how rows are split
+    between processes.
+
+    """
+
+    arrays = state['arrays']
+    for row in range(*rows):
+        rng = np.random.default_rng([iter_seed, row])
+        if 'counts' in arrays:
+            counts, subsampled = arrays['counts'][row], arrays['subsampled'][row]
+            observed = np.flatnonzero(counts)
+            subsampled[:] = 0
+            subsampled[observed] = rng.multivariate_hypergeometric(counts[observed], size)
+        else:
+            start, end = arrays['indptr'][row], arrays['indptr'][row + 1]
+            arrays['subsampled'][start:end] = rng.multivariate_hypergeometric(arrays['data'][start:end], size)
+
+    return
+
+
+def _compute_block(state, bounds, subsampled):
+    """
+    Computes the distances between two blocks of rows for each calculator, adding them to the summed distances.
+
+    The squares of the distances are also summed when subsampling so the standard deviation can be calculated. Each
+    block is only ever computed by one process per iteration, so the sums can be updated in place.
+
+    """
+
+    matrix = _state_matrix(state, subsampled)
+    arrays = state['arrays']
+
+    i0, i1, j0, j1 = bounds
+    a, b = matrix[i0:i1], matrix[j0:j1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, calc in enumerate(state['calcs']):
+            dists = CALCULATORS[calc](a, b)
+            arrays['sum'][k, i0:i1, j0:j1] += dists
+            if 'sum_sq' in arrays:
+                arrays['sum_sq'][k, i0:i1, j0:j1] += dists * dists
+
+    return
+
+
+def _create_shared(shape, dtype, handles):
+    """Creates a numpy array backed by shared memory, appending the shared memory handle to `handles`."""
+
+    dtype = np.dtype(dtype)
+    shm = SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    handles.append(shm)
+
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf), (shm.name, shape, dtype.str)
+
+
+def _attach_shared(spec, handles):
+    """Attaches to a shared memory numpy array created by _create_shared()."""
+
+    name, shape, dtype = spec
+    shm = SharedMemory(name=name)
+    handles.append(shm)
+
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+# state of each worker process, set by _init_worker()
+_worker_state = dict()
+
+
+def _init_worker(specs, shape, calcs):
+    """Attaches a worker process to the shared input and output arrays."""
+
+    handles = list()
+    _worker_state['handles'] = handles
+    _worker_state['arrays'] = {k: _attach_shared(v, handles) for k, v in specs.items()}
+    _worker_state['shape'] = shape
+    _worker_state['calcs'] = calcs
+
+    return
+
+
+def _run_in_worker(func, *args):
+    """Runs one of the engine tasks against the state of this worker process."""
+
+    return func(_worker_state, *args)
+
+
+def _symmetrise(out):
+    """Fills the lower triangle of each distance matrix in `out` from the upper triangle and zeros the diagonal."""
+
+    upper = np.triu(out, 1)
+    return upper + np.swapaxes(upper, 1, 2)
+
+
+class _DistanceEngine(object):
+    """
+    Computes pairwise distances between the rows of a count matrix, optionally after subsampling each row.
+
+    Distances are summed over each call to compute(), and are only averaged and symmetrised by distances(). When run
+    with more than one processor the counts, subsampled counts, and summed distances are stored in shared memory, so
+    that each worker process can subsample its rows and add its blocks to the sums without the matrices being copied
+    between processes.
+
+    """
+
+    def __init__(self, counts, sparse, calcs, subsample=None, processors=1, block_size=256):
+        """
+
+        :param counts: (groups x otus) matrix of counts
+        :type counts: numpy.ndarray
+        :param sparse: whether to store the counts as a sparse matrix
+        :type sparse: bool
+        :param calcs: names of the calculators to use
+        :type calcs: list
+        :param subsample: number of counts to subsample each row to before calculating distances, or None
+        :type subsample: int or None
+        :param processors: number of processes to split the rows and blocks across
+        :type processors: int
+        :param block_size: number of rows in each block
+        :type block_size: int
+
+        """
+
+        self.subsample = subsample
+        self.rows = _block_edges(counts.shape[0], block_size)
+        self.bounds = _block_bounds(counts.shape[0], block_size)
+
+        if sparse:
+            matrix = scipy.sparse.csr_matrix(counts)
+            arrays = {'data': matrix.data, 'indices': matrix.indices, 'indptr': matrix.indptr}
+        else:
+            arrays = {'counts': counts}
+        if subsample is not None:
+            arrays['subsampled'] = np.zeros_like(arrays['data'] if sparse else arrays['counts'])
+        arrays['sum'] = np.zeros((len(calcs), counts.shape[0], counts.shape[0]), dtype=np.float64)
+        if subsample is not None:
+            arrays['sum_sq'] = np.zeros_like(arrays['sum'])
+        self.iterations = 0
+
+        self._handles = list()
+        self._pool = None
+
+        if processors > 1:
+            specs = dict()
+            for key, array in list(arrays.items()):
+                arrays[key], specs[key] = _create_shared(array.shape, array.dtype, self._handles)
+                arrays[key][:] = array
+            self._pool = ProcessPoolExecutor(max_workers=processors, initializer=_init_worker,
+                                             initargs=(specs, counts.shape, calcs))
+
+        self._state = {'arrays': arrays, 'shape': counts.shape, 'calcs': calcs}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Shuts down the worker processes and releases the shared memory."""
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        # views of the shared buffers must be released before the shared memory can be closed
+        self._state = None
+        for shm in self._handles:
+            shm.close()
+            shm.unlink()
+        self._handles = list()
+
+        return
+
+    def _run(self, func, tasks):
+        """Runs `func` for each set of arguments in `tasks`, across the worker processes if there are any."""
+
+        if self._pool is None:
+            for args in tasks:
+                func(self._state, *args)
+            return
+
+        futures = [self._pool.submit(_run_in_worker, func, *args) for args in tasks]
+        wait(futures)
+        for future in futures:
+            # re-raise any exceptions from the workers
+            future.result()
+
+        return
+
+    def compute(self, iter_seed=None):
+        """
+        Computes the distances between each row of the counts, subsampling the counts first if required.
+
+        :param iter_seed: seed for subsampling the counts in this iteration
+        :type iter_seed: int or None
+
+        """
+
+        subsampled = self.subsample is not None
+        if subsampled:
+            self._run(_subsample_rows, [(rows, self.subsample, iter_seed) for rows in self.rows])
+        self._run(_compute_block, [(bounds, subsampled) for bounds in self.bounds])
+        self.iterations += 1
+
+        return
+
+    def distances(self):
+        """
+        Returns the mean distances over each call to compute(), and their standard deviations when subsampling.
+
+        :return: (calcs x groups x groups) arrays of the mean distances and the standard deviations, or None
+        :rtype: tuple
+
+        """
+
+        arrays = self._state['arrays']
+        mean = arrays['sum'][:] / self.iterations
+        std = None
+        if 'sum_sq' in arrays:
+            std = _symmetrise(np.sqrt(np.maximum(arrays['sum_sq'] / self.iterations - mean * mean, 0)))
+
+        return _symmetrise(mean), std
+
+
+# --------------- output --------------- #
+
+def _format_dist(value):
+    return '%.6f' % value
+
+
+def write_dist(filename, groups, dists, output='lt'):
+    """
+    Writes a distance matrix to file in a mothur compatible format.
+
+    :param filename: name of the file to write
+    :type filename: str
+    :param groups: names of the groups in the distance matrix
+    :type groups: list
+    :param dists: square distance matrix
+    :type dists: numpy.ndarray
+    :param output: the mothur output format, either 'lt' or 'square' for phylip files, or 'column' for column files
+    :type output: str
+
+    """
+
+    with open(filename, 'w') as out_handle:
+        if output == 'column':
+            for i in range(len(groups)):
+                for j in range(i):
+                    out_handle.write('%s\t%s\t%s\n' % (groups[i], groups[j], _format_dist(dists[i, j])))
+        else:
+            out_handle.write('%d\n' % len(groups))
+            for i, group in enumerate(groups):
+                row = dists[i, :i] if output == 'lt' else dists[i]
+                out_handle.write('\t'.join([group] + [_format_dist(d) for d in row]) + '\n')
+
+    return
+
+
+# --------------- main entry point --------------- #
+
+def _parse_mothur_list(item):
+    """Parses a hyphen separated mothur list, python iterable, or single value, into a python list of strings."""
+
+    if item is None:
+        return None
+    if isinstance(item, str):
+        return item.split('-')
+    if isinstance(item, collections.abc.Iterable):
+        return [str(x) for x in item]
+
+    # single values such as label=0.03 are compared as strings against the shared file
+    return [str(item)]
+
+
+def _parse_mothur_subsample(subsample):
+    """Parses a mothur subsample parameter into True, a number of counts, or None when not subsampling."""
+
+    # mothur booleans are 'T' or 'F', the reverse of utils.convert_mothur_bool()
+    if isinstance(subsample, str) and subsample in ('T', 'F'):
+        subsample = subsample == 'T'
+    if subsample is None or subsample is False:
+        return None
+    if subsample is True:
+        return True
+
+    return int(subsample)
+
+
+def dist_shared(shared, calc='jclass-thetayc', label=None, groups=None, subsample=None, iters=1000, seed=None,
+                processors=1, block_size=256, sparse=None, output=None, outputdir=None):
+    """
+    Computes pairwise distances between groups in a mothur `.shared` file without running mothur.
+
+    This supports the `braycurtis`, `thetayc`, `jclass`, and `jest` calculators of mothur's `dist.shared` command.
+
+    :param shared: path to the `.shared` file
+    :type shared: str
+    :param calc: calculators to use, as a mothur hyphen separated list or a python iterable
+    :type calc: str or list
+    :param label: labels to calculate distances for, as a mothur list or python iterable. Defaults to all labels, as
+    does 'all'
+    :type label: str or list or None
+    :param groups: groups to calculate distances for, as a mothur list or python iterable. Defaults to all groups, as
+    does 'all'
+    :type groups: str or list or None
+    :param subsample: number of counts to subsample each group to, or True to use the size of the smallest group.
+    Groups with fewer counts are removed
+    :type subsample: int or str or bool or None
+    :param iters: number of subsampling iterations to average distances over
+    :type iters: int
+    :param seed: seed for the random number generator used for subsampling
+    :type seed: int or None
+    :param processors: number of processes to split the subsampling and calculation across
+    :type processors: int
+    :param block_size: number of groups in each block of distances calculated at a time
+    :type block_size: int
+    :param sparse: whether to use sparse matrices. Defaults to using sparse matrices when the counts are mostly zero
+    :type sparse: bool or None
+    :param output: format of distance files to write, either 'lt', 'square', or 'column'. Defaults to not writing files
+    :type output: str or None
+    :param outputdir: directory to write distance files to. Defaults to the directory of the `.shared` file
+    :type outputdir: str or None
+
+    :return: the group names for each label, the distances and standard deviations from subsampling for each label and
+    calculator, and the written output files
+    :rtype: mothur_py.distances.SharedDistances
+
+    """
+
+    # numeric parameters may be passed as strings, as they would be for mothur
+    processors, iters, block_size = int(processors), int(iters), int(block_size)
+    subsample = _parse_mothur_subsample(subsample)
+
+    calcs = _parse_mothur_list(calc)
+    invalid = [c for c in calcs if c not in CALCULATORS]
+    if invalid:
+        raise (ValueError('unsupported calculators: %s. Must be one of %s.' %
+                          (', '.join(invalid), ', '.join(CALCULATORS))))
+    if output not in (None, 'lt', 'square', 'column'):
+        raise (ValueError("output must be 'lt', 'square', or 'column', not %s." % output))
+    if processors < 1:
+        raise (ValueError('processors must be a positive integer, not %s.' % processors))
+    if iters < 1:
+        raise (ValueError('iters must be a positive integer, not %s.' % iters))
+    if block_size < 1:
+        raise (ValueError('block_size must be a positive integer, not %s.' % block_size))
+
+    # mothur uses 'all' to select every label or group
+    labels = None if label == 'all' else _parse_mothur_list(label)
+    groups = None if groups == 'all' else _parse_mothur_list(groups)
+    shared_data = read_shared(shared, labels=labels, groups=groups)
+
+    rng = np.random.default_rng(seed)
+    distances = collections.OrderedDict()
+    stdevs = collections.OrderedDict() if subsample else None
+    label_groups = collections.OrderedDict()
+
+    for label_name, (group_names, counts) in shared_data.items():
+
+        size = None
+        if subsample:
+            totals = counts.sum(axis=1)
+            size = int(totals.min()) if subsample is True else subsample
+            keep = totals >= size
+            group_names = [g for g, k in zip(group_names, keep) if k]
+            counts = counts[keep]
+        label_groups[label_name] = group_names
+
+        use_sparse = sparse
+        if use_sparse is None:
+            use_sparse = np.count_nonzero(counts) < SPARSE_DENSITY_THRESHOLD * counts.size
+
+        with _DistanceEngine(counts, use_sparse, calcs, size, processors, block_size) as engine:
+            if subsample:
+                for iter_seed in rng.integers(2 ** 32, size=iters):
+                    engine.compute(iter_seed)
+            else:
+                engine.compute()
+            mean, std = engine.distances()
+
+        if subsample:
+            stdevs[label_name] = collections.OrderedDict(zip(calcs, std))
+
+        distances[label_name] = collections.OrderedDict(zip(calcs, mean))
+
+    output_files = list()
+    if output is not None:
+        if outputdir is None:
+            outputdir = os.path.dirname(shared)
+        root = os.path.join(outputdir, os.path.splitext(os.path.basename(shared))[0])
+        for label_name, label_dists in distances.items():
+            for calc_name, dists in label_dists.items():
+                filename = '%s.%s.%s.%s' % (root, calc_name, label_name, output)
+                if subsample:
+                    write_dist(filename + '.ave.dist', label_groups[label_name], dists, output)
+                    write_dist(filename + '.std.dist', label_groups[label_name], stdevs[label_name][calc_name], output)
+                    output_files.extend([filename + '.ave.dist', filename + '.std.dist'])
+                else:
+                    write_dist(filename + '.dist', label_groups[label_name], dists, output)
+                    output_files.append(filename + '.dist')
+
+    return SharedDistances(label_groups, distances, stdevs, output_files)
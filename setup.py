@@ -34,5 +34,8 @@ setup(
 
     keywords="mothur bioinformatics",
     packages=find_packages(),
+    extras_require={
+        'distances': ['numpy>=1.18', 'scipy']
+    },
     include_package_data=True
 )
@@ -0,0 +1,227 @@
+import os
+import unittest
+from shutil import rmtree
+
+import numpy as np
+
+from mothur_py.core import Mothur
+from mothur_py.distances import dist_shared
+
+
+class TestDistShared(unittest.TestCase):
+
+    def setUp(self):
+        """Sets up testing variables."""
+
+        # setup directories for testing
+        test_dir = os.path.join(os.getcwd(), 'tests')
+        self.test_output_dir = os.path.join(test_dir, 'test_output')
+        if not os.path.isdir(self.test_output_dir):
+            os.makedirs(self.test_output_dir)
+        self.test_input_dir = os.path.join(test_dir, 'test_data')
+        self.test_shared = os.path.join(self.test_input_dir, 'test_shared_1.shared')
+        self.test_shared_labels = os.path.join(self.test_input_dir, 'test_shared_2.shared')
+
+        return
+
+    def test_distances(self):
+        """Test that distances are calculated correctly for dense and sparse matrices."""
+
+        for sparse in [False, True]:
+            results = dist_shared(self.test_shared, calc='braycurtis-thetayc-jclass-jest', sparse=sparse)
+            dists = results.distances['0.03']
+            self.assertEqual(results.groups['0.03'], ['A', 'B', 'C', 'D'])
+            self.assertAlmostEqual(dists['braycurtis'][0, 1], 0.6)
+            self.assertAlmostEqual(dists['thetayc'][0, 1], 1 - 0.22 / 0.465)
+            self.assertAlmostEqual(dists['jclass'][1, 0], 2 / 3)
+            # chao1 of 4.5 for both groups and a shared chao1 of 2
+            self.assertAlmostEqual(dists['jest'][0, 1], 5 / 7)
+            for calc in dists:
+                self.assertEqual(dists[calc][2, 2], 0)
+                np.testing.assert_allclose(dists[calc], dists[calc].T)
+
+        return
+
+    def test_jest_no_doubletons(self):
+        """Test the bias-corrected chao1 used by jest when there are singletons but no doubletons."""
+
+        for sparse in [False, True]:
+            dists = dist_shared(self.test_shared_labels, calc='jest', label='0.03', sparse=sparse).distances['0.03']
+            # group C has two singletons and no doubletons, giving a chao1 of 4
+            self.assertAlmostEqual(dists['jest'][0, 2], 0.5)
+            self.assertAlmostEqual(dists['jest'][1, 2], 1 / 3)
+
+        return
+
+    def test_processors(self):
+        """Test that splitting blocks across processes gives the same distances as a single process."""
+
+        calcs = ['braycurtis', 'thetayc', 'jclass', 'jest']
+        single = dist_shared(self.test_shared, calc=calcs, subsample=True, iters=10, seed=123)
+        multi = dist_shared(self.test_shared, calc=calcs, subsample=True, iters=10, seed=123, processors=2,
+                            block_size=1)
+
+        for calc in calcs:
+            np.testing.assert_allclose(single.distances['0.03'][calc], multi.distances['0.03'][calc])
+            np.testing.assert_allclose(single.stdevs['0.03'][calc], multi.stdevs['0.03'][calc])
+
+        return
+
+    def test_label(self):
+        """Test that labels can be passed as mothur lists, python iterables, or single values."""
+
+        for label in ['0.03', ['0.03'], 0.03]:
+            results = dist_shared(self.test_shared, calc='jclass', label=label)
+            self.assertEqual(list(results.distances), ['0.03'])
+
+        return
+
+    def test_label_groups(self):
+        """Test that each label keeps its own group names, including in the written files."""
+
+        results = dist_shared(self.test_shared_labels, calc='jclass', output='lt', outputdir=self.test_output_dir)
+        self.assertEqual(results.groups, {'0.03': ['A', 'B', 'C'], '0.05': ['A', 'B']})
+        self.assertEqual(results.distances['0.05']['jclass'].shape, (2, 2))
+
+        with open(os.path.join(self.test_output_dir, 'test_shared_2.jclass.0.03.lt.dist'), 'r') as in_handle:
+            self.assertEqual(in_handle.read().splitlines(), ['3', 'A', 'B\t0.500000', 'C\t0.500000\t0.500000'])
+        with open(os.path.join(self.test_output_dir, 'test_shared_2.jclass.0.05.lt.dist'), 'r') as in_handle:
+            self.assertEqual(in_handle.read().splitlines(), ['2', 'A', 'B\t0.333333'])
+
+        return
+
+    def test_groups(self):
+        """Test selecting groups, including mothur's 'all' keyword, and that missing groups raise an error."""
+
+        results = dist_shared(self.test_shared, calc='jclass', groups='A-C')
+        self.assertEqual(results.groups['0.03'], ['A', 'C'])
+
+        results = dist_shared(self.test_shared, calc='jclass', groups='all', label='all')
+        self.assertEqual(results.groups['0.03'], ['A', 'B', 'C', 'D'])
+
+        with self.assertRaises(ValueError):
+            dist_shared(self.test_shared, calc='jclass', groups='A-Z')
+
+        return
+
+    def test_mothur_parameters(self):
+        """Test that numeric and boolean parameters can be passed as strings, as they would be to mothur."""
+
+        expected = dist_shared(self.test_shared, calc='jclass', subsample=15, iters=5, seed=1)
+        results = dist_shared(self.test_shared, calc='jclass', subsample='15', iters='5', seed=1, processors='2',
+                              block_size='2')
+        np.testing.assert_allclose(results.distances['0.03']['jclass'], expected.distances['0.03']['jclass'])
+
+        results = dist_shared(self.test_shared_labels, calc='jclass', subsample='T', iters='2')
+        self.assertEqual(list(results.stdevs), ['0.03', '0.05'])
+        results = dist_shared(self.test_shared_labels, calc='jclass', subsample='F')
+        self.assertIsNone(results.stdevs)
+
+        return
+
+    def test_invalid_calc(self):
+        """Test that unsupported calculators raise an error."""
+
+        with self.assertRaises(ValueError):
+            dist_shared(self.test_shared, calc='sharedsobs')
+
+        return
+
+    def test_output_formats(self):
+        """Test writing distances as square phylip and column files."""
+
+        results = dist_shared(self.test_shared_labels, calc='jclass', label='0.05', output='square',
+                              outputdir=self.test_output_dir)
+        with open(results.output_files[0], 'r') as in_handle:
+            self.assertEqual(in_handle.read().splitlines(), ['2', 'A\t0.000000\t0.333333', 'B\t0.333333\t0.000000'])
+
+        results = dist_shared(self.test_shared_labels, calc='jclass', label='0.05', output='column',
+                              outputdir=self.test_output_dir)
+        self.assertEqual(results.output_files,
+                         [os.path.join(self.test_output_dir, 'test_shared_2.jclass.0.05.column.dist')])
+        with open(results.output_files[0], 'r') as in_handle:
+            self.assertEqual(in_handle.read().splitlines(), ['B\tA\t0.333333'])
+
+        return
+
+    def test_subsample(self):
+        """Test that subsampling removes small groups and writes the average and standard deviation files."""
+
+        results = dist_shared(self.test_shared, calc='jclass', subsample=15, iters=5, seed=1)
+        self.assertEqual(results.groups['0.03'], ['A', 'C', 'D'])
+
+        # subsampling to the size of every group keeps all counts, so the distances are the same each iteration
+        results = dist_shared(self.test_shared_labels, calc='jclass', subsample=True, iters=5, seed=1, output='lt',
+                              outputdir=self.test_output_dir)
+        root = os.path.join(self.test_output_dir, 'test_shared_2.jclass')
+        self.assertEqual(results.output_files, [root + '.0.03.lt.ave.dist', root + '.0.03.lt.std.dist',
+                                                root + '.0.05.lt.ave.dist', root + '.0.05.lt.std.dist'])
+
+        expected = [
+            ['3', 'A', 'B\t0.500000', 'C\t0.500000\t0.500000'],
+            ['3', 'A', 'B\t0.000000', 'C\t0.000000\t0.000000'],
+            ['2', 'A', 'B\t0.333333'],
+            ['2', 'A', 'B\t0.000000'],
+        ]
+        for output_file, lines in zip(results.output_files, expected):
+            with open(output_file, 'r') as in_handle:
+                self.assertEqual(in_handle.read().splitlines(), lines)
+
+        return
+
+    def test_mothur_dist_shared(self):
+        """Test that Mothur.dist_shared() uses the latest shared file and writes mothur compatible output."""
+
+        m = Mothur(suppress_logfile=True)
+        m.current_dirs['output'] = self.test_output_dir
+        m.output_files['shared'].append(self.test_shared)
+        results = m.dist_shared(calc='braycurtis')
+
+        dist_file = os.path.join(self.test_output_dir, 'test_shared_1.braycurtis.0.03.lt.dist')
+        self.assertEqual(results.output_files, [dist_file])
+        self.assertEqual(m.output_files['dist'], [dist_file])
+        self.assertEqual(m.current_files['phylip'], dist_file)
+        with open(dist_file, 'r') as in_handle:
+            lines = in_handle.read().splitlines()
+        self.assertEqual(lines[0], '4')
+        self.assertEqual(lines[2], 'B\t0.600000')
+
+        return
+
+    def test_mothur_dist_shared_current(self):
+        """Test that Mothur.dist_shared() falls back to the current shared file, resolved from the input directory."""
+
+        m = Mothur(suppress_logfile=True)
+        m.current_dirs['input'] = self.test_input_dir
+        m.current_dirs['output'] = self.test_output_dir
+        m.current_files['shared'] = 'test_shared_1.shared'
+        results = m.dist_shared(calc='jclass', output='column')
+
+        dist_file = os.path.join(self.test_output_dir, 'test_shared_1.jclass.0.03.column.dist')
+        self.assertEqual(results.output_files, [dist_file])
+        self.assertEqual(m.output_files['dist'], [dist_file])
+        self.assertEqual(m.current_files['column'], dist_file)
+        self.assertNotIn('phylip', m.current_files)
+
+        return
+
+    def test_mothur_dist_shared_no_current(self):
+        """Test that Mothur.dist_shared() errors when there is no current shared file."""
+
+        m = Mothur(suppress_logfile=True)
+
+        with self.assertRaises(ValueError):
+            m.dist_shared()
+
+        return
+
+    def tearDown(self):
+        """Cleans up testing environment."""
+
+        rmtree(self.test_output_dir)
+
+        return
+
+
+if __name__ == '__main__':
+    unittest.main()